@@ -1,12 +1,18 @@
 import csv
+import hmac
 import io
 import os
+import queue
+import re
 import secrets
 import tempfile
+import time
+from contextlib import contextmanager
 from datetime import datetime
 from urllib.parse import urlparse
 
-from flask import Flask, Response, abort, jsonify, redirect, render_template, request, url_for
+from flask import Flask, Response, abort, jsonify, redirect, render_template, request, send_file, stream_with_context, url_for
+from markupsafe import escape
 
 # --- PostgreSQL (pg8000) ---
 try:
@@ -29,13 +35,20 @@ FIELDNAMES = [
     "A3-2 満足度", "A3-2 感想", "H4-1 満足度", "H4-1 感想", "不具合クイズ", "テクバンへのご要望",
 ]
 REQUIRED_FIELDS = ["name", "phone", "email", "company", "department", "position"]
+# Shape checks for half-width input, run only once the field is non-empty
+_VALIDATORS = (
+    ("email", re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")),
+    ("phone", re.compile(r"^[\d\-+() ]{6,}$", re.ASCII)),
+)
 
 _DB_COLS = [
     "submitted_at", "name", "phone", "email", "company", "department", "position",
     "seminar1_rating", "seminar1_comment", "seminar2_rating", "seminar2_comment", "quiz_answer", "request",
 ]
-_JP_TO_DB = dict(zip(FIELDNAMES, _DB_COLS))
 _DB_TO_JP = dict(zip(_DB_COLS, FIELDNAMES))
+# Form inputs share their names with the DB columns (everything but the timestamp)
+_FORM_FIELDS = tuple(_DB_COLS[1:])
+_REQUIRED = frozenset(REQUIRED_FIELDS)
 
 TOKEN_FILE = os.path.join(DATA_DIR, "admin_token.txt")
 
@@ -46,230 +59,321 @@ def _pg_url():
     return os.environ.get("POSTGRES_URL") or os.environ.get("DATABASE_URL") or ""
 
 
-def _pg_conn():
-    if not _HAS_PG:
-        return None
-    url = _pg_url()
+def _build_conn_kwargs(url):
     if not url:
         return None
     p = urlparse(url)
-    return pg8000.native.Connection(
-        user=p.username,
-        password=p.password,
-        host=p.hostname,
-        port=p.port or 5432,
-        database=p.path.lstrip("/"),
-        ssl_context=True,
-    )
+    return {
+        "user": p.username,
+        "password": p.password,
+        "host": p.hostname,
+        "port": p.port or 5432,
+        "database": p.path.lstrip("/"),
+        "ssl_context": True,
+    }
 
 
-def _init_pg():
+# Parsed once; the environment does not change for the life of an instance
+_PG_CONN_KWARGS = _build_conn_kwargs(_pg_url())
+
+
+def _pg_conn():
+    if not _HAS_PG or not _PG_CONN_KWARGS:
+        return None
+    return pg8000.native.Connection(**_PG_CONN_KWARGS)
+
+
+# Connections are kept open between requests so warm instances skip the
+# TCP + TLS + auth handshake. LIFO keeps the most recently used (and most
+# likely still alive) connection at the front.
+_PG_POOL_SIZE = int(os.environ.get("PG_POOL_SIZE", "5"))
+_PG_IDLE_CHECK = 30  # seconds idle before a pooled connection is re-validated
+_pg_pool = queue.LifoQueue(maxsize=_PG_POOL_SIZE)
+
+
+def _pg_discard(conn):
     try:
-        conn = _pg_conn()
+        conn.close()
     except Exception:
-        return False
-    if conn is None:
-        return False
-    try:
-        conn.run("""
-            CREATE TABLE IF NOT EXISTS responses (
-                id SERIAL PRIMARY KEY,
-                submitted_at TEXT NOT NULL,
-                name TEXT NOT NULL,
-                phone TEXT NOT NULL,
-                email TEXT NOT NULL,
-                company TEXT NOT NULL,
-                department TEXT NOT NULL DEFAULT '',
-                position TEXT NOT NULL,
-                seminar1_rating TEXT NOT NULL DEFAULT '',
-                seminar1_comment TEXT NOT NULL DEFAULT '',
-                seminar2_rating TEXT NOT NULL DEFAULT '',
-                seminar2_comment TEXT NOT NULL DEFAULT '',
-                quiz_answer TEXT NOT NULL DEFAULT '',
-                request TEXT NOT NULL DEFAULT ''
-            )
-        """)
-        # Migrate existing table: add new columns if they don't exist
-        for col in ["department", "seminar1_rating", "seminar1_comment",
-                     "seminar2_rating", "seminar2_comment", "quiz_answer", "request"]:
-            try:
-                conn.run(f"ALTER TABLE responses ADD COLUMN {col} TEXT NOT NULL DEFAULT ''")
-            except Exception:
-                pass  # column already exists
-        # Drop old comment column if it exists
+        pass
+
+
+def _pg_checkout():
+    while True:
+        try:
+            conn, last_used = _pg_pool.get_nowait()
+        except queue.Empty:
+            return _pg_conn()
+        if time.monotonic() - last_used < _PG_IDLE_CHECK:
+            return conn
         try:
-            conn.run("ALTER TABLE responses DROP COLUMN IF EXISTS comment")
+            conn.run("SELECT 1")
+            return conn
         except Exception:
-            pass
-        # Archive table for soft-deleted responses (30-day retention)
-        conn.run("""
-            CREATE TABLE IF NOT EXISTS archived_responses (
-                id SERIAL PRIMARY KEY,
-                original_id INTEGER NOT NULL,
-                deleted_at TIMESTAMP NOT NULL DEFAULT NOW(),
-                submitted_at TEXT NOT NULL,
-                name TEXT NOT NULL,
-                phone TEXT NOT NULL,
-                email TEXT NOT NULL,
-                company TEXT NOT NULL DEFAULT '',
-                department TEXT NOT NULL DEFAULT '',
-                position TEXT NOT NULL,
-                seminar1_rating TEXT NOT NULL DEFAULT '',
-                seminar1_comment TEXT NOT NULL DEFAULT '',
-                seminar2_rating TEXT NOT NULL DEFAULT '',
-                seminar2_comment TEXT NOT NULL DEFAULT '',
-                quiz_answer TEXT NOT NULL DEFAULT '',
-                request TEXT NOT NULL DEFAULT ''
-            )
-        """)
-        # Migrate archived_responses: add new columns if they don't exist
-        for col in ["department", "seminar1_rating", "seminar1_comment",
-                     "seminar2_rating", "seminar2_comment", "quiz_answer", "request"]:
+            _pg_discard(conn)
+
+
+def _pg_checkin(conn):
+    try:
+        _pg_pool.put_nowait((conn, time.monotonic()))
+    except queue.Full:
+        _pg_discard(conn)
+
+
+@contextmanager
+def _pg():
+    """Borrow a pooled connection (None when Postgres is not configured).
+
+    A connection that raised is closed instead of being returned to the pool.
+    """
+    conn = _pg_checkout()
+    if conn is None:
+        yield None
+        return
+    try:
+        yield conn
+    except BaseException:
+        _pg_discard(conn)
+        raise
+    _pg_checkin(conn)
+
+
+def _init_pg():
+    try:
+        with _pg() as conn:
+            if conn is None:
+                return False
+            conn.run("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    id SERIAL PRIMARY KEY,
+                    submitted_at TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    phone TEXT NOT NULL,
+                    email TEXT NOT NULL,
+                    company TEXT NOT NULL,
+                    department TEXT NOT NULL DEFAULT '',
+                    position TEXT NOT NULL,
+                    seminar1_rating TEXT NOT NULL DEFAULT '',
+                    seminar1_comment TEXT NOT NULL DEFAULT '',
+                    seminar2_rating TEXT NOT NULL DEFAULT '',
+                    seminar2_comment TEXT NOT NULL DEFAULT '',
+                    quiz_answer TEXT NOT NULL DEFAULT '',
+                    request TEXT NOT NULL DEFAULT ''
+                )
+            """)
+            # Migrate existing table: add new columns if they don't exist
+            for col in ["department", "seminar1_rating", "seminar1_comment",
+                         "seminar2_rating", "seminar2_comment", "quiz_answer", "request"]:
+                try:
+                    conn.run(f"ALTER TABLE responses ADD COLUMN {col} TEXT NOT NULL DEFAULT ''")
+                except Exception:
+                    pass  # column already exists
+            # Drop old comment column if it exists
             try:
-                conn.run(f"ALTER TABLE archived_responses ADD COLUMN {col} TEXT NOT NULL DEFAULT ''")
+                conn.run("ALTER TABLE responses DROP COLUMN IF EXISTS comment")
             except Exception:
                 pass
-        # Purge archived responses older than 30 days
-        conn.run("DELETE FROM archived_responses WHERE deleted_at < NOW() - INTERVAL '30 days'")
-        return True
+            # Archive table for soft-deleted responses (30-day retention)
+            conn.run("""
+                CREATE TABLE IF NOT EXISTS archived_responses (
+                    id SERIAL PRIMARY KEY,
+                    original_id INTEGER NOT NULL,
+                    deleted_at TIMESTAMP NOT NULL DEFAULT NOW(),
+                    submitted_at TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    phone TEXT NOT NULL,
+                    email TEXT NOT NULL,
+                    company TEXT NOT NULL DEFAULT '',
+                    department TEXT NOT NULL DEFAULT '',
+                    position TEXT NOT NULL,
+                    seminar1_rating TEXT NOT NULL DEFAULT '',
+                    seminar1_comment TEXT NOT NULL DEFAULT '',
+                    seminar2_rating TEXT NOT NULL DEFAULT '',
+                    seminar2_comment TEXT NOT NULL DEFAULT '',
+                    quiz_answer TEXT NOT NULL DEFAULT '',
+                    request TEXT NOT NULL DEFAULT ''
+                )
+            """)
+            # Migrate archived_responses: add new columns if they don't exist
+            for col in ["department", "seminar1_rating", "seminar1_comment",
+                         "seminar2_rating", "seminar2_comment", "quiz_answer", "request"]:
+                try:
+                    conn.run(f"ALTER TABLE archived_responses ADD COLUMN {col} TEXT NOT NULL DEFAULT ''")
+                except Exception:
+                    pass
+            # Purge archived responses older than 30 days
+            conn.run("DELETE FROM archived_responses WHERE deleted_at < NOW() - INTERVAL '30 days'")
+            return True
     except Exception:
         return False
-    finally:
-        conn.close()
 
 
 _use_pg = _init_pg()
 
 
-def _pg_save(data: dict):
+_INSERT_SQL = (
+    "INSERT INTO responses (submitted_at, name, phone, email, company, department, position,"
+    " seminar1_rating, seminar1_comment, seminar2_rating, seminar2_comment, quiz_answer, request)"
+    " VALUES (:submitted_at, :name, :phone, :email, :company, :department, :position,"
+    " :seminar1_rating, :seminar1_comment, :seminar2_rating, :seminar2_comment, :quiz_answer, :request)"
+)
+
+
+def _pg_insert_statement(conn):
+    # Prepared once per pooled connection so repeat INSERTs skip parse/plan
+    ps = getattr(conn, "_insert_ps", None)
+    if ps is None:
+        ps = conn._insert_ps = conn.prepare(_INSERT_SQL)
+    return ps
+
+
+def _pg_save(values):
+    """Insert one response; values are in FIELDNAMES order."""
     try:
-        conn = _pg_conn()
+        with _pg() as conn:
+            if conn is None:
+                return False
+            _pg_insert_statement(conn).run(**dict(zip(_DB_COLS, values)))
+            return True
     except Exception:
         return False
-    if conn is None:
-        return False
+
+
+def _pg_save_many(rows):
+    """Insert several responses (each in FIELDNAMES order) in one transaction."""
     try:
-        row = {_JP_TO_DB[k]: v for k, v in data.items()}
-        conn.run(
-            "INSERT INTO responses (submitted_at, name, phone, email, company, department, position,"
-            " seminar1_rating, seminar1_comment, seminar2_rating, seminar2_comment, quiz_answer, request)"
-            " VALUES (:submitted_at, :name, :phone, :email, :company, :department, :position,"
-            " :seminar1_rating, :seminar1_comment, :seminar2_rating, :seminar2_comment, :quiz_answer, :request)",
-            **row,
-        )
-        return True
+        with _pg() as conn:
+            if conn is None:
+                return False
+            ps = _pg_insert_statement(conn)
+            conn.run("BEGIN")
+            try:
+                for values in rows:
+                    ps.run(**dict(zip(_DB_COLS, values)))
+            except Exception:
+                conn.run("ROLLBACK")
+                raise
+            conn.run("COMMIT")
+            return True
     except Exception:
         return False
-    finally:
-        conn.close()
 
 
 def _pg_load():
+    """Return (id, *values) tuples in FIELDNAMES order, or None on failure."""
     try:
-        conn = _pg_conn()
-    except Exception:
-        return None
-    if conn is None:
-        return None
-    try:
-        result = conn.run(
-            "SELECT id, submitted_at, name, phone, email, company, department, position,"
-            " seminar1_rating, seminar1_comment, seminar2_rating, seminar2_comment, quiz_answer, request"
-            " FROM responses ORDER BY id"
-        )
-        rows = []
-        for r in result:
-            row = {"id": r[0]}
-            row.update({_DB_TO_JP[col]: val for col, val in zip(_DB_COLS, r[1:])})
-            rows.append(row)
-        return rows
+        with _pg() as conn:
+            if conn is None:
+                return None
+            result = conn.run(
+                "SELECT id, submitted_at, name, phone, email, company, department, position,"
+                " seminar1_rating, seminar1_comment, seminar2_rating, seminar2_comment, quiz_answer, request"
+                " FROM responses ORDER BY id"
+            )
+            return [tuple(r) for r in result]
     except Exception:
         return None
-    finally:
-        conn.close()
+
+
+_PG_EXPORT_BATCH = 500
+
+
+def _pg_iter_rows():
+    """Yield response rows in FIELDNAMES order, fetched in id-ordered batches."""
+    last_id = 0
+    while True:
+        try:
+            with _pg() as conn:
+                if conn is None:
+                    return
+                batch = conn.run(
+                    "SELECT id, submitted_at, name, phone, email, company, department, position,"
+                    " seminar1_rating, seminar1_comment, seminar2_rating, seminar2_comment, quiz_answer, request"
+                    " FROM responses WHERE id > :last_id ORDER BY id LIMIT :limit",
+                    last_id=last_id,
+                    limit=_PG_EXPORT_BATCH,
+                )
+        except Exception:
+            return
+        for r in batch:
+            yield r[1:]
+        if len(batch) < _PG_EXPORT_BATCH:
+            return
+        last_id = batch[-1][0]
+
+
+def _pg_csv_stream():
+    yield _CSV_HEADER
+    for row in _pg_iter_rows():
+        yield _csv_line(row)
 
 
 def _pg_delete(response_id):
     """Soft-delete: move to archive table."""
     try:
-        conn = _pg_conn()
-    except Exception:
-        return False
-    if conn is None:
-        return False
-    try:
-        conn.run(
-            "INSERT INTO archived_responses (original_id, submitted_at, name, phone, email,"
-            " company, department, position, seminar1_rating, seminar1_comment,"
-            " seminar2_rating, seminar2_comment, quiz_answer, request)"
-            " SELECT id, submitted_at, name, phone, email, company, department, position,"
-            " seminar1_rating, seminar1_comment, seminar2_rating, seminar2_comment, quiz_answer, request"
-            " FROM responses WHERE id = :id",
-            id=response_id,
-        )
-        conn.run("DELETE FROM responses WHERE id = :id", id=response_id)
-        return True
+        with _pg() as conn:
+            if conn is None:
+                return False
+            conn.run(
+                "INSERT INTO archived_responses (original_id, submitted_at, name, phone, email,"
+                " company, department, position, seminar1_rating, seminar1_comment,"
+                " seminar2_rating, seminar2_comment, quiz_answer, request)"
+                " SELECT id, submitted_at, name, phone, email, company, department, position,"
+                " seminar1_rating, seminar1_comment, seminar2_rating, seminar2_comment, quiz_answer, request"
+                " FROM responses WHERE id = :id",
+                id=response_id,
+            )
+            conn.run("DELETE FROM responses WHERE id = :id", id=response_id)
+            return True
     except Exception:
         return False
-    finally:
-        conn.close()
 
 
 def _pg_load_archived():
     try:
-        conn = _pg_conn()
-    except Exception:
-        return None
-    if conn is None:
-        return None
-    try:
-        conn.run("DELETE FROM archived_responses WHERE deleted_at < NOW() - INTERVAL '30 days'")
-        result = conn.run(
-            "SELECT id, deleted_at, submitted_at, name, phone, email, company, department,"
-            " position, seminar1_rating, seminar1_comment, seminar2_rating,"
-            " seminar2_comment, quiz_answer, request"
-            " FROM archived_responses ORDER BY deleted_at DESC"
-        )
-        rows = []
-        for r in result:
-            row = {"id": r[0], "deleted_at": r[1].strftime("%Y-%m-%d %H:%M") if r[1] else ""}
-            row.update({_DB_TO_JP[col]: val for col, val in zip(_DB_COLS, r[2:])})
-            rows.append(row)
-        return rows
+        with _pg() as conn:
+            if conn is None:
+                return None
+            conn.run("DELETE FROM archived_responses WHERE deleted_at < NOW() - INTERVAL '30 days'")
+            result = conn.run(
+                "SELECT id, deleted_at, submitted_at, name, phone, email, company, department,"
+                " position, seminar1_rating, seminar1_comment, seminar2_rating,"
+                " seminar2_comment, quiz_answer, request"
+                " FROM archived_responses ORDER BY deleted_at DESC"
+            )
+            rows = []
+            for r in result:
+                row = {"id": r[0], "deleted_at": r[1].strftime("%Y-%m-%d %H:%M") if r[1] else ""}
+                row.update({_DB_TO_JP[col]: val for col, val in zip(_DB_COLS, r[2:])})
+                rows.append(row)
+            return rows
     except Exception:
         return None
-    finally:
-        conn.close()
 
 
 def _pg_restore(archive_id):
     try:
-        conn = _pg_conn()
-    except Exception:
-        return False
-    if conn is None:
-        return False
-    try:
-        conn.run(
-            "INSERT INTO responses (submitted_at, name, phone, email, company, department,"
-            " position, seminar1_rating, seminar1_comment, seminar2_rating,"
-            " seminar2_comment, quiz_answer, request)"
-            " SELECT submitted_at, name, phone, email, company, department, position,"
-            " seminar1_rating, seminar1_comment, seminar2_rating, seminar2_comment, quiz_answer, request"
-            " FROM archived_responses WHERE id = :id",
-            id=archive_id,
-        )
-        conn.run("DELETE FROM archived_responses WHERE id = :id", id=archive_id)
-        return True
+        with _pg() as conn:
+            if conn is None:
+                return False
+            conn.run(
+                "INSERT INTO responses (submitted_at, name, phone, email, company, department,"
+                " position, seminar1_rating, seminar1_comment, seminar2_rating,"
+                " seminar2_comment, quiz_answer, request)"
+                " SELECT submitted_at, name, phone, email, company, department, position,"
+                " seminar1_rating, seminar1_comment, seminar2_rating, seminar2_comment, quiz_answer, request"
+                " FROM archived_responses WHERE id = :id",
+                id=archive_id,
+            )
+            conn.run("DELETE FROM archived_responses WHERE id = :id", id=archive_id)
+            return True
     except Exception:
         return False
-    finally:
-        conn.close()
 
 
 # --- Token ---
 
-def get_or_create_admin_token():
+def _resolve_admin_token():
     env_token = os.environ.get("ADMIN_TOKEN")
     if env_token:
         return env_token.strip()
@@ -283,30 +387,59 @@ def get_or_create_admin_token():
     return token
 
 
+# Resolved once per instance so admin requests never touch the filesystem
+_ADMIN_TOKEN = _resolve_admin_token()
+
+
+def _is_admin_token(token):
+    return hmac.compare_digest(token.encode(), _ADMIN_TOKEN.encode())
+
+
 # --- CSV fallback ---
 
+_CSV_NEEDS_QUOTE = re.compile(r'[",\r\n]')
+
+
+def _csv_escape(value):
+    value = "" if value is None else str(value)
+    if _CSV_NEEDS_QUOTE.search(value):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def _csv_line(values):
+    return ",".join(map(_csv_escape, values)) + "\r\n"
+
+
+_CSV_HEADER = "\ufeff" + _csv_line(FIELDNAMES)
+
+
 def ensure_csv():
     os.makedirs(DATA_DIR, exist_ok=True)
     if not os.path.exists(CSV_FILE):
         with open(CSV_FILE, "w", newline="", encoding="utf-8-sig") as f:
-            writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
-            writer.writeheader()
+            f.write(_csv_line(FIELDNAMES))
 
 
-def save_response_csv(data: dict):
+def save_response_csv(values):
+    """Append one response; values are in FIELDNAMES order."""
     ensure_csv()
     with open(CSV_FILE, "a", newline="", encoding="utf-8-sig") as f:
-        writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
-        writer.writerow(data)
+        f.write(_csv_line(values))
 
 
 def load_responses_csv():
+    """Return (id, *values) tuples in FIELDNAMES order; id is the row position."""
     ensure_csv()
-    with open(CSV_FILE, "r", encoding="utf-8-sig") as f:
-        rows = list(csv.DictReader(f))
-    for i, row in enumerate(rows):
-        row["id"] = i
-    return rows
+    with open(CSV_FILE, "rb", buffering=1 << 20) as f:
+        data = f.read().decode("utf-8-sig")
+    if '"' in data:
+        # Quoted fields may hold commas or line breaks; let csv handle them
+        records = (r for r in csv.reader(io.StringIO(data, newline="")) if r)
+    else:
+        records = (line.rstrip("\r").split(",") for line in data.split("\n") if line.rstrip("\r"))
+    next(records, None)  # header
+    return [(i, *r) for i, r in enumerate(records)]
 
 
 ARCHIVE_FIELDNAMES = ["deleted_at"] + FIELDNAMES
@@ -322,20 +455,17 @@ def ensure_archive_csv():
 
 def delete_response_csv(response_id):
     rows = load_responses_csv()
-    target = next((r for r in rows if r["id"] == response_id), None)
-    remaining = [r for r in rows if r["id"] != response_id]
+    target = next((r for r in rows if r[0] == response_id), None)
     with open(CSV_FILE, "w", newline="", encoding="utf-8-sig") as f:
-        writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
-        writer.writeheader()
-        for r in remaining:
-            del r["id"]
-            writer.writerow(r)
+        f.write(_csv_line(FIELDNAMES))
+        for r in rows:
+            if r[0] != response_id:
+                f.write(_csv_line(r[1:]))
     if target:
         ensure_archive_csv()
-        del target["id"]
-        target["deleted_at"] = datetime.now().strftime("%Y-%m-%d %H:%M")
+        deleted_at = datetime.now().strftime("%Y-%m-%d %H:%M")
         with open(ARCHIVE_CSV, "a", newline="", encoding="utf-8-sig") as f:
-            csv.DictWriter(f, fieldnames=ARCHIVE_FIELDNAMES).writerow(target)
+            f.write(_csv_line((deleted_at, *target[1:])))
 
 
 def load_archived_csv():
@@ -355,8 +485,7 @@ def restore_response_csv(archive_id):
     target = next((r for r in rows if r["id"] == archive_id), None)
     remaining = [r for r in rows if r["id"] != archive_id]
     if target:
-        restore_row = {k: target[k] for k in FIELDNAMES}
-        save_response_csv(restore_row)
+        save_response_csv([target[k] for k in FIELDNAMES])
     with open(ARCHIVE_CSV, "w", newline="", encoding="utf-8-sig") as f:
         writer = csv.DictWriter(f, fieldnames=ARCHIVE_FIELDNAMES)
         writer.writeheader()
@@ -367,14 +496,33 @@ def restore_response_csv(archive_id):
 
 # --- Routes ---
 
+_HEALTH_TTL = float(os.environ.get("HEALTH_CACHE_TTL", "5"))
+_health_cache = {"ts": 0.0, "ok": False}
+
+
+def _pg_alive():
+    # Uptime pings can be frequent; probe the database at most once per TTL
+    now = time.monotonic()
+    if now - _health_cache["ts"] > _HEALTH_TTL:
+        try:
+            with _pg() as conn:
+                if conn is not None:
+                    conn.run("SELECT 1")
+                ok = conn is not None
+        except Exception:
+            ok = False
+        _health_cache.update(ts=now, ok=ok)
+    return _health_cache["ok"]
+
+
 @app.route("/health")
 def health():
-    pg_url = _pg_url()
     return jsonify({
         "status": "ok",
         "pg8000_imported": _HAS_PG,
-        "postgres_url_set": bool(pg_url),
+        "postgres_url_set": bool(_PG_CONN_KWARGS),
         "postgres_connected": _use_pg,
+        "postgres_alive": _use_pg and _pg_alive(),
     })
 
 
@@ -383,50 +531,33 @@ def index():
     return render_template("form.html", errors={}, values={})
 
 
+def _now_str():
+    t = time.localtime()
+    return "%04d-%02d-%02d %02d:%02d:%02d" % (t.tm_year, t.tm_mon, t.tm_mday, t.tm_hour, t.tm_min, t.tm_sec)
+
+
 @app.route("/submit", methods=["POST"])
 def submit():
-    values = {
-        "name": request.form.get("name", "").strip(),
-        "phone": request.form.get("phone", "").strip(),
-        "email": request.form.get("email", "").strip(),
-        "company": request.form.get("company", "").strip(),
-        "department": request.form.get("department", "").strip(),
-        "position": request.form.get("position", "").strip(),
-        "seminar1_rating": request.form.get("seminar1_rating", "").strip(),
-        "seminar1_comment": request.form.get("seminar1_comment", "").strip(),
-        "seminar2_rating": request.form.get("seminar2_rating", "").strip(),
-        "seminar2_comment": request.form.get("seminar2_comment", "").strip(),
-        "quiz_answer": request.form.get("quiz_answer", "").strip(),
-        "request": request.form.get("request", "").strip(),
-        "privacy": request.form.get("privacy", ""),
-    }
-
+    form = request.form
+    values = {}
     errors = {}
-    for field in REQUIRED_FIELDS:
-        if not values[field]:
+    for field in _FORM_FIELDS:
+        value = form.get(field, "").strip()
+        values[field] = value
+        if not value and field in _REQUIRED:
             errors[field] = "この項目は必須です。"
+    values["privacy"] = form.get("privacy", "")
+    for field, pattern in _VALIDATORS:
+        if values[field] and not pattern.match(values[field]):
+            errors[field] = "形式が正しくありません。"
     if not values["privacy"]:
         errors["privacy"] = "同意が必要です。"
 
     if errors:
         return render_template("form.html", errors=errors, values=values)
 
-    row = {
-        "受付日時": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "氏名": values["name"],
-        "電話番号": values["phone"],
-        "メールアドレス": values["email"],
-        "会社名": values["company"],
-        "部署名": values["department"],
-        "役職": values["position"],
-        "A3-2 満足度": values["seminar1_rating"],
-        "A3-2 感想": values["seminar1_comment"],
-        "H4-1 満足度": values["seminar2_rating"],
-        "H4-1 感想": values["seminar2_comment"],
-        "不具合クイズ": values["quiz_answer"],
-        "テクバンへのご要望": values["request"],
-    }
-
+    # One tuple in FIELDNAMES order serves both storage backends
+    row = (_now_str(), *(values[field] for field in _FORM_FIELDS))
     if _use_pg:
         _pg_save(row)
     else:
@@ -440,6 +571,33 @@ def thanks():
     return render_template("thanks.html")
 
 
+_QUIZ_INDEX = FIELDNAMES.index("不具合クイズ")
+_QUIZ_CORRECT = "メールアドレス欄のラベルをタップすると別の入力欄にフォーカスが当たる"
+
+
+def _admin_row(row, token):
+    """Render one (id, *values) response row as a <tr>."""
+    cells = []
+    for i, value in enumerate(row[1:]):
+        if i == _QUIZ_INDEX:
+            if value == _QUIZ_CORRECT:
+                value = '<span class="badge bg-success">正解</span>'
+            elif value:
+                value = '<span class="badge bg-danger">不正解</span>'
+            else:
+                value = '<span class="badge bg-secondary">未回答</span>'
+        else:
+            value = escape(value)
+        cells.append(f"<td>{value}</td>")
+    if token:
+        cells.append(
+            f'<td><form method="POST" action="/admin/{escape(token)}/delete/{row[0]}"'
+            " onsubmit=\"return confirm('この回答を削除しますか？');\" style=\"margin:0;\">"
+            '<button type="submit" class="btn btn-outline-danger btn-sm">削除</button></form></td>'
+        )
+    return "<tr>" + "".join(cells) + "</tr>\n"
+
+
 def render_admin(share_url, token):
     if _use_pg:
         rows = _pg_load() or []
@@ -448,14 +606,32 @@ def render_admin(share_url, token):
         rows = load_responses_csv()
         archived = load_archived_csv()
     csv_url = share_url.rstrip("/") + "/csv" if share_url else None
-    return render_template("admin.html", rows=rows, archived=archived, fieldnames=FIELDNAMES, share_url=share_url, csv_url=csv_url, admin_token=token)
+    context = dict(row_count=len(rows), archived=archived, fieldnames=FIELDNAMES, share_url=share_url, csv_url=csv_url, admin_token=token)
+
+    # The responses table can be long, so its rows are built directly and
+    # streamed between the header and footer partials instead of via Jinja.
+    def generate():
+        yield render_template("admin_header.html", **context)
+        for row in rows:
+            yield _admin_row(row, token)
+        yield render_template("admin_footer.html", **context)
+
+    return Response(stream_with_context(generate()), mimetype="text/html")
+
+
+@app.before_request
+def _admin_guard():
+    # Every /admin/<token>/... route is checked here; the /admin login form is not
+    token = (request.view_args or {}).get("token")
+    if token is not None and not _is_admin_token(token):
+        abort(403)
 
 
 @app.route("/admin", methods=["GET", "POST"])
 def admin_login():
     if request.method == "POST":
         token = request.form.get("token", "").strip()
-        if token == get_or_create_admin_token():
+        if _is_admin_token(token):
             return render_admin(request.host_url.rstrip("/") + "/admin/" + token, token)
         return render_template("login.html", error="トークンが正しくありません。"), 403
     return render_template("login.html", error=None)
@@ -463,15 +639,11 @@ def admin_login():
 
 @app.route("/admin/<token>")
 def admin(token):
-    if token != get_or_create_admin_token():
-        return abort(403)
     return render_admin(request.url, token)
 
 
 @app.route("/admin/<token>/delete/<int:response_id>", methods=["POST"])
 def admin_delete(token, response_id):
-    if token != get_or_create_admin_token():
-        return abort(403)
     if _use_pg:
         _pg_delete(response_id)
     else:
@@ -481,8 +653,6 @@ def admin_delete(token, response_id):
 
 @app.route("/admin/<token>/restore/<int:archive_id>", methods=["POST"])
 def admin_restore(token, archive_id):
-    if token != get_or_create_admin_token():
-        return abort(403)
     if _use_pg:
         _pg_restore(archive_id)
     else:
@@ -492,24 +662,13 @@ def admin_restore(token, archive_id):
 
 @app.route("/admin/<token>/csv")
 def admin_csv(token):
-    if token != get_or_create_admin_token():
-        return abort(403)
-
-    if _use_pg:
-        rows = _pg_load() or []
-    else:
-        rows = load_responses_csv()
-
-    buf = io.StringIO()
-    buf.write("\ufeff")
-    writer = csv.DictWriter(buf, fieldnames=FIELDNAMES)
-    writer.writeheader()
-    for row in rows:
-        csv_row = {k: row[k] for k in FIELDNAMES}
-        writer.writerow(csv_row)
+    if not _use_pg:
+        # The file is written BOM + header + rows, exactly the export format
+        ensure_csv()
+        return send_file(CSV_FILE, mimetype="text/csv", as_attachment=True, download_name="responses.csv")
 
     return Response(
-        buf.getvalue(),
+        _pg_csv_stream(),
         mimetype="text/csv",
         headers={"Content-Disposition": "attachment; filename=responses.csv"},
     )
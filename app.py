@@ -1,20 +1,40 @@
+import atexit
 import csv
+import hashlib
+import hmac
 import io
+import itertools
+import mmap
 import os
+import re
 import secrets
+import threading
+import time
 from datetime import datetime
 
-from flask import Flask, Response, abort, redirect, render_template, request, url_for
+from flask import Flask, Response, abort, redirect, render_template, request, send_file, stream_with_context, url_for
+from markupsafe import escape
 
 import db
 
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:
+    pa = None
+
 app = Flask(__name__)
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
 CSV_FILE = os.path.join(DATA_DIR, "responses.csv")
 
 FIELDNAMES = db.FIELDNAMES
-REQUIRED_FIELDS = ["name", "phone", "email", "company", "department", "position"]
+REQUIRED_FIELDS = ("name", "phone", "email", "company", "department", "position")
+# Form inputs in FIELDNAMES order (after the 受付日時 timestamp)
+_FORM_FIELDS = (
+    "name", "phone", "email", "company", "department", "position",
+    "seminar1_rating", "seminar1_comment", "seminar2_rating", "seminar2_comment", "quiz_answer", "request",
+)
 
 TOKEN_FILE = os.path.join(DATA_DIR, "admin_token.txt")
 
@@ -22,42 +42,128 @@ TOKEN_FILE = os.path.join(DATA_DIR, "admin_token.txt")
 _use_pg = db.init_db()
 
 
+_ADMIN_TOKEN = None
+
+
 def get_or_create_admin_token():
+    global _ADMIN_TOKEN
+    if _ADMIN_TOKEN is not None:
+        return _ADMIN_TOKEN
     # Prefer environment variable so token survives Vercel cold starts
     env_token = os.environ.get("ADMIN_TOKEN")
     if env_token:
-        return env_token.strip()
-    os.makedirs(DATA_DIR, exist_ok=True)
-    if os.path.exists(TOKEN_FILE):
-        with open(TOKEN_FILE, "r") as f:
-            return f.read().strip()
-    token = secrets.token_urlsafe(32)
-    with open(TOKEN_FILE, "w") as f:
-        f.write(token)
+        token = env_token.strip()
+    else:
+        os.makedirs(DATA_DIR, exist_ok=True)
+        if os.path.exists(TOKEN_FILE):
+            with open(TOKEN_FILE, "r") as f:
+                token = f.read().strip()
+        else:
+            token = secrets.token_urlsafe(32)
+            with open(TOKEN_FILE, "w") as f:
+                f.write(token)
+    _ADMIN_TOKEN = token
     return token
 
 
+# Resolve at startup so the token file is only read on a cold start
+get_or_create_admin_token()
+
+
+def _is_admin_token(token):
+    return hmac.compare_digest(token.encode(), get_or_create_admin_token().encode())
+
+
 # --- CSV fallback helpers (used only when POSTGRES_URL is not set) ---
 
+_CSV_NEEDS_QUOTE = re.compile(r'[",\r\n]')
+
+
+def _csv_escape(value):
+    value = "" if value is None else str(value)
+    if _CSV_NEEDS_QUOTE.search(value):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def _csv_line(values):
+    return ",".join(map(_csv_escape, values)) + "\r\n"
+
+
 def ensure_csv():
     os.makedirs(DATA_DIR, exist_ok=True)
     if not os.path.exists(CSV_FILE):
         with open(CSV_FILE, "w", newline="", encoding="utf-8-sig") as f:
-            writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
-            writer.writeheader()
-
-
-def save_response_csv(data: dict):
-    ensure_csv()
-    with open(CSV_FILE, "a", newline="", encoding="utf-8-sig") as f:
-        writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
-        writer.writerow(data)
+            f.write(_csv_line(FIELDNAMES))
+
+
+_CSV_HEADER = "\ufeff" + _csv_line(FIELDNAMES)
+
+
+# Submissions are appended through one long-lived handle. Readers and
+# rewriters take the same (re-entrant) lock and flush it first, so they always
+# see every accepted row; fsync only happens every _CSV_FSYNC_EVERY rows.
+_CSV_FSYNC_EVERY = 16
+_csv_lock = threading.RLock()
+_csv_fp = None
+_csv_unsynced = 0
+
+
+def _csv_flush(fsync=False):
+    global _csv_unsynced
+    with _csv_lock:
+        if _csv_fp is None:
+            return
+        _csv_fp.flush()
+        if fsync:
+            os.fsync(_csv_fp.fileno())
+            _csv_unsynced = 0
+
+
+def save_response_csv(values):
+    """Append one response; values are in FIELDNAMES order."""
+    global _csv_fp, _csv_unsynced
+    line = _csv_line(values)
+    with _csv_lock:
+        if _csv_fp is None:
+            ensure_csv()
+            _csv_fp = open(CSV_FILE, "a", buffering=1 << 16, newline="", encoding="utf-8-sig")
+            atexit.register(_csv_flush, fsync=True)
+        _csv_fp.write(line)
+        _csv_unsynced += 1
+        if _csv_unsynced >= _CSV_FSYNC_EVERY:
+            _csv_flush(fsync=True)
+
+
+# Above this size the multi-threaded Arrow parser is used when pyarrow is installed
+_ARROW_MIN_BYTES = 1 << 20
+
+
+def _load_csv_arrow():
+    table = pacsv.read_csv(
+        CSV_FILE,
+        # Name the columns ourselves and skip the (BOM-prefixed) header line
+        read_options=pacsv.ReadOptions(column_names=FIELDNAMES, skip_rows=1),
+        parse_options=pacsv.ParseOptions(newlines_in_values=True),
+        # Keep everything as text: phone numbers must not lose leading zeros
+        convert_options=pacsv.ConvertOptions(
+            column_types={name: pa.string() for name in FIELDNAMES},
+            strings_can_be_null=False,
+        ),
+    )
+    return table.to_pylist()
 
 
 def load_responses_csv():
     ensure_csv()
-    with open(CSV_FILE, "r", encoding="utf-8-sig") as f:
-        rows = list(csv.DictReader(f))
+    _csv_flush()
+    if pa is not None and os.path.getsize(CSV_FILE) > _ARROW_MIN_BYTES:
+        rows = _load_csv_arrow()
+    else:
+        # Decode straight from the page cache instead of through buffered reads
+        with open(CSV_FILE, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            text = str(mm, "utf-8-sig")
+        rows = list(csv.DictReader(io.StringIO(text, newline="")))
     for i, row in enumerate(rows):
         row["id"] = i
     return rows
@@ -71,25 +177,23 @@ def ensure_archive_csv():
     os.makedirs(DATA_DIR, exist_ok=True)
     if not os.path.exists(ARCHIVE_CSV):
         with open(ARCHIVE_CSV, "w", newline="", encoding="utf-8-sig") as f:
-            csv.DictWriter(f, fieldnames=ARCHIVE_FIELDNAMES).writeheader()
+            f.write(_csv_line(ARCHIVE_FIELDNAMES))
 
 
 def delete_response_csv(response_id):
-    rows = load_responses_csv()
-    target = next((r for r in rows if r["id"] == response_id), None)
-    remaining = [r for r in rows if r["id"] != response_id]
-    with open(CSV_FILE, "w", newline="", encoding="utf-8-sig") as f:
-        writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
-        writer.writeheader()
-        for r in remaining:
-            del r["id"]
-            writer.writerow(r)
+    with _csv_lock:
+        rows = load_responses_csv()
+        target = next((r for r in rows if r["id"] == response_id), None)
+        remaining = [r for r in rows if r["id"] != response_id]
+        with open(CSV_FILE, "w", newline="", encoding="utf-8-sig") as f:
+            f.write(_csv_line(FIELDNAMES))
+            for r in remaining:
+                f.write(_csv_line(r[k] for k in FIELDNAMES))
     if target:
         ensure_archive_csv()
-        del target["id"]
         target["deleted_at"] = datetime.now().strftime("%Y-%m-%d %H:%M")
         with open(ARCHIVE_CSV, "a", newline="", encoding="utf-8-sig") as f:
-            csv.DictWriter(f, fieldnames=ARCHIVE_FIELDNAMES).writerow(target)
+            f.write(_csv_line(target[k] for k in ARCHIVE_FIELDNAMES))
 
 
 def load_archived_csv():
@@ -109,66 +213,52 @@ def restore_response_csv(archive_id):
     target = next((r for r in rows if r["id"] == archive_id), None)
     remaining = [r for r in rows if r["id"] != archive_id]
     if target:
-        restore_row = {k: target[k] for k in FIELDNAMES}
-        save_response_csv(restore_row)
+        save_response_csv([target[k] for k in FIELDNAMES])
     with open(ARCHIVE_CSV, "w", newline="", encoding="utf-8-sig") as f:
-        writer = csv.DictWriter(f, fieldnames=ARCHIVE_FIELDNAMES)
-        writer.writeheader()
+        f.write(_csv_line(ARCHIVE_FIELDNAMES))
         for r in remaining:
-            del r["id"]
-            writer.writerow(r)
+            f.write(_csv_line(r[k] for k in ARCHIVE_FIELDNAMES))
 
 
 # --- Routes ---
 
+# The empty form and the thanks page never change between requests, so they
+# are rendered once and served with an ETag for conditional GETs.
+with app.test_request_context():
+    _FORM_HTML = render_template("form.html", errors={}, values={}).encode()
+    _THANKS_HTML = render_template("thanks.html").encode()
+_FORM_ETAG = hashlib.blake2b(_FORM_HTML, digest_size=8).hexdigest()
+_THANKS_ETAG = hashlib.blake2b(_THANKS_HTML, digest_size=8).hexdigest()
+
+
+def _static_page(body, etag):
+    resp = Response(body, mimetype="text/html")
+    resp.set_etag(etag)
+    resp.cache_control.public = True
+    resp.cache_control.max_age = 3600
+    return resp.make_conditional(request)
+
+
 @app.route("/")
 def index():
-    return render_template("form.html", errors={}, values={})
+    return _static_page(_FORM_HTML, _FORM_ETAG)
 
 
 @app.route("/submit", methods=["POST"])
 def submit():
-    values = {
-        "name": request.form.get("name", "").strip(),
-        "phone": request.form.get("phone", "").strip(),
-        "email": request.form.get("email", "").strip(),
-        "company": request.form.get("company", "").strip(),
-        "department": request.form.get("department", "").strip(),
-        "position": request.form.get("position", "").strip(),
-        "seminar1_rating": request.form.get("seminar1_rating", "").strip(),
-        "seminar1_comment": request.form.get("seminar1_comment", "").strip(),
-        "seminar2_rating": request.form.get("seminar2_rating", "").strip(),
-        "seminar2_comment": request.form.get("seminar2_comment", "").strip(),
-        "quiz_answer": request.form.get("quiz_answer", "").strip(),
-        "request": request.form.get("request", "").strip(),
-        "privacy": request.form.get("privacy", ""),
-    }
-
-    errors = {}
-    for field in REQUIRED_FIELDS:
-        if not values[field]:
-            errors[field] = "この項目は必須です。"
+    form = request.form
+    values = {field: form.get(field, "").strip() for field in _FORM_FIELDS}
+    values["privacy"] = form.get("privacy", "")
+
+    errors = {field: "この項目は必須です。" for field in REQUIRED_FIELDS if not values[field]}
     if not values["privacy"]:
         errors["privacy"] = "同意が必要です。"
 
     if errors:
         return render_template("form.html", errors=errors, values=values)
 
-    row = {
-        "受付日時": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "氏名": values["name"],
-        "電話番号": values["phone"],
-        "メールアドレス": values["email"],
-        "会社名": values["company"],
-        "部署名": values["department"],
-        "役職": values["position"],
-        "A3-2 満足度": values["seminar1_rating"],
-        "A3-2 感想": values["seminar1_comment"],
-        "H4-1 満足度": values["seminar2_rating"],
-        "H4-1 感想": values["seminar2_comment"],
-        "不具合クイズ": values["quiz_answer"],
-        "テクバンへのご要望": values["request"],
-    }
+    # One tuple in FIELDNAMES order serves both storage backends
+    row = (time.strftime("%Y-%m-%d %H:%M:%S"), *(values[f] for f in _FORM_FIELDS))
 
     if _use_pg:
         db.save_response(row)
@@ -180,25 +270,71 @@ def submit():
 
 @app.route("/thanks")
 def thanks():
-    return render_template("thanks.html")
+    return _static_page(_THANKS_HTML, _THANKS_ETAG)
+
+
+_QUIZ_INDEX = FIELDNAMES.index("不具合クイズ")
+_QUIZ_CORRECT = "メールアドレス欄のラベルをタップすると別の入力欄にフォーカスが当たる"
+
+
+def _admin_row(row, token):
+    """Render one (id, *values) response row as a <tr>."""
+    cells = []
+    for i, value in enumerate(row[1:]):
+        if i == _QUIZ_INDEX:
+            if value == _QUIZ_CORRECT:
+                value = '<span class="badge bg-success">正解</span>'
+            elif value:
+                value = '<span class="badge bg-danger">不正解</span>'
+            else:
+                value = '<span class="badge bg-secondary">未回答</span>'
+        else:
+            value = escape(value)
+        cells.append(f"<td>{value}</td>")
+    if token:
+        cells.append(
+            f'<td><form method="POST" action="/admin/{escape(token)}/delete/{row[0]}"'
+            " onsubmit=\"return confirm('この回答を削除しますか？');\" style=\"margin:0;\">"
+            '<button type="submit" class="btn btn-outline-danger btn-sm">削除</button></form></td>'
+        )
+    return "<tr>" + "".join(cells) + "</tr>\n"
+
+
+ADMIN_PAGE_SIZE = 100
 
 
 def render_admin(share_url, token):
+    page = max(request.args.get("page", 0, type=int), 0)
+    offset = page * ADMIN_PAGE_SIZE
     if _use_pg:
-        rows = db.load_responses() or []
+        total = db.count_responses() or 0
+        rows = db.load_responses(limit=ADMIN_PAGE_SIZE, offset=offset) or []
         archived = db.load_archived() or []
     else:
-        rows = load_responses_csv()
+        all_rows = load_responses_csv()
+        total = len(all_rows)
+        page_rows = itertools.islice(reversed(all_rows), offset, offset + ADMIN_PAGE_SIZE)
+        rows = [(r["id"], *(r[k] for k in FIELDNAMES)) for r in page_rows]
         archived = load_archived_csv()
     csv_url = share_url.rstrip("/") + "/csv" if share_url else None
-    return render_template("admin.html", rows=rows, archived=archived, fieldnames=FIELDNAMES, share_url=share_url, csv_url=csv_url, admin_token=token)
+    context = dict(row_count=total, page=page, has_more=offset + len(rows) < total, archived=archived, fieldnames=FIELDNAMES, share_url=share_url, csv_url=csv_url, admin_token=token)
+
+    # The responses table can be long, so its rows are built directly and
+    # streamed between the header and footer partials instead of via Jinja.
+    def generate():
+        yield render_template("admin_header.html", **context)
+        for row in rows:
+            yield _admin_row(row, token)
+        yield render_template("admin_footer.html", **context)
+
+    return Response(stream_with_context(generate()), mimetype="text/html")
 
 
 @app.route("/admin", methods=["GET", "POST"])
 def admin_login():
     if request.method == "POST":
         token = request.form.get("token", "").strip()
-        if token == get_or_create_admin_token():
+        if _is_admin_token(token):
             return render_admin(request.host_url.rstrip("/") + "/admin/" + token, token)
         return render_template("login.html", error="トークンが正しくありません。"), 403
     return render_template("login.html", error=None)
@@ -206,14 +342,14 @@ def admin_login():
 
 @app.route("/admin/<token>")
 def admin(token):
-    if token != get_or_create_admin_token():
+    if not _is_admin_token(token):
         return abort(403)
-    return render_admin(request.url, token)
+    return render_admin(request.base_url, token)
 
 
 @app.route("/admin/<token>/delete/<int:response_id>", methods=["POST"])
 def admin_delete(token, response_id):
-    if token != get_or_create_admin_token():
+    if not _is_admin_token(token):
         return abort(403)
     if _use_pg:
         db.delete_response(response_id)
@@ -224,7 +360,7 @@ def admin_delete(token, response_id):
 
 @app.route("/admin/<token>/restore/<int:archive_id>", methods=["POST"])
 def admin_restore(token, archive_id):
-    if token != get_or_create_admin_token():
+    if not _is_admin_token(token):
         return abort(403)
     if _use_pg:
         db.restore_response(archive_id)
@@ -235,24 +371,22 @@ def admin_restore(token, archive_id):
 
 @app.route("/admin/<token>/csv")
 def admin_csv(token):
-    if token != get_or_create_admin_token():
+    if not _is_admin_token(token):
         return abort(403)
 
-    if _use_pg:
-        csv_data = db.responses_to_csv_string() or ""
-    else:
+    if not _use_pg:
+        # The file is written BOM + header + rows, exactly the export format
         ensure_csv()
-        buf = io.StringIO()
-        buf.write("\ufeff")  # BOM for Excel
-        writer = csv.DictWriter(buf, fieldnames=FIELDNAMES)
-        writer.writeheader()
-        with open(CSV_FILE, "r", encoding="utf-8-sig") as f:
-            for row in csv.DictReader(f):
-                writer.writerow(row)
-        csv_data = buf.getvalue()
+        _csv_flush()
+        return send_file(CSV_FILE, mimetype="text/csv", as_attachment=True, download_name="responses.csv", conditional=True)
+
+    def generate():
+        yield _CSV_HEADER
+        for row in db.iter_responses():
+            yield _csv_line(row)
 
     return Response(
-        csv_data,
+        stream_with_context(generate()),
         mimetype="text/csv",
         headers={"Content-Disposition": "attachment; filename=responses.csv"},
     )
@@ -268,4 +402,7 @@ if __name__ == "__main__":
     else:
         print(f"  ストレージ: CSV (ローカル)")
     print(f"{'=' * 50}\n")
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    if os.environ.get("FLASK_DEV"):
+        app.run(host="0.0.0.0", port=5000, debug=True)
+    else:
+        print("  開発サーバーは FLASK_DEV=1 で起動します。本番は ./start.sh (gunicorn) を使用してください。\n")
@@ -4,9 +4,10 @@ When POSTGRES_URL (or DATABASE_URL) is set, data is stored in PostgreSQL.
 Otherwise falls back to local CSV storage.
 """
 
-import csv
-import io
 import os
+import queue
+import time
+from contextlib import contextmanager
 from urllib.parse import urlparse
 
 try:
@@ -19,251 +20,336 @@ FIELDNAMES = [
     "A3-2 満足度", "A3-2 感想", "H4-1 満足度", "H4-1 感想", "不具合クイズ", "テクバンへのご要望",
 ]
 
-_DB_COLS = [
+# Column for each entry of FIELDNAMES, in the same order
+_DB_COLS = (
     "submitted_at", "name", "phone", "email", "company", "department", "position",
     "seminar1_rating", "seminar1_comment", "seminar2_rating", "seminar2_comment", "quiz_answer", "request",
-]
-_JP_TO_DB = dict(zip(FIELDNAMES, _DB_COLS))
-_DB_TO_JP = dict(zip(_DB_COLS, FIELDNAMES))
+)
 
 
 def _get_url():
     return os.environ.get("POSTGRES_URL") or os.environ.get("DATABASE_URL") or ""
 
 
-def _get_conn():
-    if pg8000 is None:
-        return None
-    url = _get_url()
+def _build_conn_kwargs(url):
     if not url:
         return None
     p = urlparse(url)
-    return pg8000.native.Connection(
-        user=p.username,
-        password=p.password,
-        host=p.hostname,
-        port=p.port or 5432,
-        database=p.path.lstrip("/"),
-        ssl_context=True,
-    )
+    return {
+        "user": p.username,
+        "password": p.password,
+        "host": p.hostname,
+        "port": p.port or 5432,
+        "database": p.path.lstrip("/"),
+        "ssl_context": True,
+    }
 
 
-def init_db():
+# Parsed once; the environment does not change for the life of a worker
+_CONN_KWARGS = _build_conn_kwargs(_get_url())
+
+
+def _get_conn():
+    if pg8000 is None or not _CONN_KWARGS:
+        return None
+    return pg8000.native.Connection(**_CONN_KWARGS)
+
+
+# Connections are kept open between requests so warm workers skip the
+# TCP + TLS + auth handshake. LIFO keeps the most recently used (and most
+# likely still alive) connection at the front.
+_POOL_SIZE = int(os.environ.get("PG_POOL_SIZE", "8"))
+_IDLE_CHECK = 30  # seconds idle before a pooled connection is re-validated
+_pool = queue.LifoQueue(maxsize=_POOL_SIZE)
+
+
+def _discard(conn):
     try:
-        conn = _get_conn()
+        conn.close()
     except Exception:
-        return False
-    if conn is None:
-        return False
-    try:
-        conn.run("""
-            CREATE TABLE IF NOT EXISTS responses (
-                id SERIAL PRIMARY KEY,
-                submitted_at TEXT NOT NULL,
-                name TEXT NOT NULL,
-                phone TEXT NOT NULL,
-                email TEXT NOT NULL,
-                company TEXT NOT NULL,
-                department TEXT NOT NULL DEFAULT '',
-                position TEXT NOT NULL,
-                seminar1_rating TEXT NOT NULL DEFAULT '',
-                seminar1_comment TEXT NOT NULL DEFAULT '',
-                seminar2_rating TEXT NOT NULL DEFAULT '',
-                seminar2_comment TEXT NOT NULL DEFAULT '',
-                quiz_answer TEXT NOT NULL DEFAULT '',
-                request TEXT NOT NULL DEFAULT ''
-            )
-        """)
-        # Migrate existing table: add new columns if they don't exist
-        for col in ["department", "seminar1_rating", "seminar1_comment",
-                     "seminar2_rating", "seminar2_comment", "quiz_answer", "request"]:
-            try:
-                conn.run(f"ALTER TABLE responses ADD COLUMN {col} TEXT NOT NULL DEFAULT ''")
-            except Exception:
-                pass  # column already exists
-        # Drop old comment column if it exists
+        pass
+
+
+def _checkout():
+    while True:
+        try:
+            conn, last_used = _pool.get_nowait()
+        except queue.Empty:
+            return _get_conn()
+        if time.monotonic() - last_used < _IDLE_CHECK:
+            return conn
         try:
-            conn.run("ALTER TABLE responses DROP COLUMN IF EXISTS comment")
+            conn.run("SELECT 1")
+            return conn
         except Exception:
-            pass
-        # Archive table for soft-deleted responses (30-day retention)
-        conn.run("""
-            CREATE TABLE IF NOT EXISTS archived_responses (
-                id SERIAL PRIMARY KEY,
-                original_id INTEGER NOT NULL,
-                deleted_at TIMESTAMP NOT NULL DEFAULT NOW(),
-                submitted_at TEXT NOT NULL,
-                name TEXT NOT NULL,
-                phone TEXT NOT NULL,
-                email TEXT NOT NULL,
-                company TEXT NOT NULL DEFAULT '',
-                department TEXT NOT NULL DEFAULT '',
-                position TEXT NOT NULL,
-                seminar1_rating TEXT NOT NULL DEFAULT '',
-                seminar1_comment TEXT NOT NULL DEFAULT '',
-                seminar2_rating TEXT NOT NULL DEFAULT '',
-                seminar2_comment TEXT NOT NULL DEFAULT '',
-                quiz_answer TEXT NOT NULL DEFAULT '',
-                request TEXT NOT NULL DEFAULT ''
-            )
-        """)
-        # Migrate archived_responses: add new columns if they don't exist
-        for col in ["department", "seminar1_rating", "seminar1_comment",
-                     "seminar2_rating", "seminar2_comment", "quiz_answer", "request"]:
+            _discard(conn)
+
+
+def _checkin(conn):
+    try:
+        _pool.put_nowait((conn, time.monotonic()))
+    except queue.Full:
+        _discard(conn)
+
+
+@contextmanager
+def _conn():
+    """Borrow a pooled connection (None when Postgres is not configured).
+
+    A connection that raised is closed instead of being returned to the pool.
+    """
+    conn = _checkout()
+    if conn is None:
+        yield None
+        return
+    try:
+        yield conn
+    except BaseException:
+        _discard(conn)
+        raise
+    _checkin(conn)
+
+
+def init_db():
+    try:
+        with _conn() as conn:
+            if conn is None:
+                return False
+            conn.run("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    id SERIAL PRIMARY KEY,
+                    submitted_at TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    phone TEXT NOT NULL,
+                    email TEXT NOT NULL,
+                    company TEXT NOT NULL,
+                    department TEXT NOT NULL DEFAULT '',
+                    position TEXT NOT NULL,
+                    seminar1_rating TEXT NOT NULL DEFAULT '',
+                    seminar1_comment TEXT NOT NULL DEFAULT '',
+                    seminar2_rating TEXT NOT NULL DEFAULT '',
+                    seminar2_comment TEXT NOT NULL DEFAULT '',
+                    quiz_answer TEXT NOT NULL DEFAULT '',
+                    request TEXT NOT NULL DEFAULT ''
+                )
+            """)
+            # Migrate existing table: add new columns if they don't exist
+            for col in ["department", "seminar1_rating", "seminar1_comment",
+                         "seminar2_rating", "seminar2_comment", "quiz_answer", "request"]:
+                try:
+                    conn.run(f"ALTER TABLE responses ADD COLUMN {col} TEXT NOT NULL DEFAULT ''")
+                except Exception:
+                    pass  # column already exists
+            # Drop old comment column if it exists
             try:
-                conn.run(f"ALTER TABLE archived_responses ADD COLUMN {col} TEXT NOT NULL DEFAULT ''")
+                conn.run("ALTER TABLE responses DROP COLUMN IF EXISTS comment")
             except Exception:
                 pass
-        # Purge archived responses older than 30 days
-        conn.run("DELETE FROM archived_responses WHERE deleted_at < NOW() - INTERVAL '30 days'")
-        return True
+            # Archive table for soft-deleted responses (30-day retention)
+            conn.run("""
+                CREATE TABLE IF NOT EXISTS archived_responses (
+                    id SERIAL PRIMARY KEY,
+                    original_id INTEGER NOT NULL,
+                    deleted_at TIMESTAMP NOT NULL DEFAULT NOW(),
+                    submitted_at TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    phone TEXT NOT NULL,
+                    email TEXT NOT NULL,
+                    company TEXT NOT NULL DEFAULT '',
+                    department TEXT NOT NULL DEFAULT '',
+                    position TEXT NOT NULL,
+                    seminar1_rating TEXT NOT NULL DEFAULT '',
+                    seminar1_comment TEXT NOT NULL DEFAULT '',
+                    seminar2_rating TEXT NOT NULL DEFAULT '',
+                    seminar2_comment TEXT NOT NULL DEFAULT '',
+                    quiz_answer TEXT NOT NULL DEFAULT '',
+                    request TEXT NOT NULL DEFAULT ''
+                )
+            """)
+            # Migrate archived_responses: add new columns if they don't exist
+            for col in ["department", "seminar1_rating", "seminar1_comment",
+                         "seminar2_rating", "seminar2_comment", "quiz_answer", "request"]:
+                try:
+                    conn.run(f"ALTER TABLE archived_responses ADD COLUMN {col} TEXT NOT NULL DEFAULT ''")
+                except Exception:
+                    pass
+            # Purge archived responses older than 30 days
+            conn.run("DELETE FROM archived_responses WHERE deleted_at < NOW() - INTERVAL '30 days'")
+            return True
     except Exception:
         return False
-    finally:
-        conn.close()
 
 
-def save_response(data: dict):
-    """Save a survey response. data keys are Japanese field names."""
+def save_response(values):
+    """Save a survey response. values are in FIELDNAMES order."""
     try:
-        conn = _get_conn()
+        with _conn() as conn:
+            if conn is None:
+                return False
+            # pg8000.native binds by name only, so pair values with columns directly
+            conn.run(
+                "INSERT INTO responses (submitted_at, name, phone, email, company, department, position,"
+                " seminar1_rating, seminar1_comment, seminar2_rating, seminar2_comment, quiz_answer, request)"
+                " VALUES (:submitted_at, :name, :phone, :email, :company, :department, :position,"
+                " :seminar1_rating, :seminar1_comment, :seminar2_rating, :seminar2_comment, :quiz_answer, :request)",
+                **dict(zip(_DB_COLS, values)),
+            )
+            return True
     except Exception:
         return False
-    if conn is None:
-        return False
+
+
+_BULK_CHUNK = 1000  # rows per INSERT; keeps well under the 65535 bind-parameter limit
+
+
+def save_responses_bulk(rows):
+    """Save many responses (each in FIELDNAMES order) with one multi-row INSERT per chunk."""
     try:
-        row = {_JP_TO_DB[k]: v for k, v in data.items()}
-        conn.run(
-            "INSERT INTO responses (submitted_at, name, phone, email, company, department, position,"
-            " seminar1_rating, seminar1_comment, seminar2_rating, seminar2_comment, quiz_answer, request)"
-            " VALUES (:submitted_at, :name, :phone, :email, :company, :department, :position,"
-            " :seminar1_rating, :seminar1_comment, :seminar2_rating, :seminar2_comment, :quiz_answer, :request)",
-            **row,
-        )
-        return True
+        with _conn() as conn:
+            if conn is None:
+                return False
+            for start in range(0, len(rows), _BULK_CHUNK):
+                params = {}
+                groups = []
+                for i, values in enumerate(rows[start:start + _BULK_CHUNK]):
+                    names = []
+                    for col, value in zip(_DB_COLS, values):
+                        params[f"{col}_{i}"] = value
+                        names.append(f":{col}_{i}")
+                    groups.append("(" + ", ".join(names) + ")")
+                conn.run(
+                    "INSERT INTO responses (submitted_at, name, phone, email, company, department, position,"
+                    " seminar1_rating, seminar1_comment, seminar2_rating, seminar2_comment, quiz_answer, request)"
+                    " VALUES " + ", ".join(groups),
+                    **params,
+                )
+            return True
     except Exception:
         return False
-    finally:
-        conn.close()
 
 
-def load_responses():
-    """Load all responses. Returns list of dicts with Japanese keys, or None on failure."""
+def load_responses(limit=100, offset=0):
+    """Load one page of responses, newest first.
+
+    Returns (id, *values) tuples in FIELDNAMES order, or None on failure.
+    """
     try:
-        conn = _get_conn()
+        with _conn() as conn:
+            if conn is None:
+                return None
+            result = conn.run(
+                "SELECT id, submitted_at, name, phone, email, company, department, position,"
+                " seminar1_rating, seminar1_comment, seminar2_rating, seminar2_comment, quiz_answer, request"
+                " FROM responses ORDER BY id DESC LIMIT :limit OFFSET :offset",
+                limit=limit,
+                offset=offset,
+            )
+            return [tuple(r) for r in result]
     except Exception:
         return None
-    if conn is None:
-        return None
+
+
+def count_responses():
+    """Return the number of stored responses, or None on failure."""
     try:
-        result = conn.run(
-            "SELECT id, submitted_at, name, phone, email, company, department, position,"
-            " seminar1_rating, seminar1_comment, seminar2_rating, seminar2_comment, quiz_answer, request"
-            " FROM responses ORDER BY id"
-        )
-        rows = []
-        for r in result:
-            row = {"id": r[0]}
-            row.update({_DB_TO_JP[col]: val for col, val in zip(_DB_COLS, r[1:])})
-            rows.append(row)
-        return rows
+        with _conn() as conn:
+            if conn is None:
+                return None
+            return conn.run("SELECT COUNT(*) FROM responses")[0][0]
     except Exception:
         return None
-    finally:
-        conn.close()
 
 
 def delete_response(response_id):
     """Soft-delete: move a response to the archive table."""
     try:
-        conn = _get_conn()
-    except Exception:
-        return False
-    if conn is None:
-        return False
-    try:
-        conn.run(
-            "INSERT INTO archived_responses (original_id, submitted_at, name, phone, email,"
-            " company, department, position, seminar1_rating, seminar1_comment,"
-            " seminar2_rating, seminar2_comment, quiz_answer, request)"
-            " SELECT id, submitted_at, name, phone, email, company, department, position,"
-            " seminar1_rating, seminar1_comment, seminar2_rating, seminar2_comment, quiz_answer, request"
-            " FROM responses WHERE id = :id",
-            id=response_id,
-        )
-        conn.run("DELETE FROM responses WHERE id = :id", id=response_id)
-        return True
+        with _conn() as conn:
+            if conn is None:
+                return False
+            conn.run(
+                "INSERT INTO archived_responses (original_id, submitted_at, name, phone, email,"
+                " company, department, position, seminar1_rating, seminar1_comment,"
+                " seminar2_rating, seminar2_comment, quiz_answer, request)"
+                " SELECT id, submitted_at, name, phone, email, company, department, position,"
+                " seminar1_rating, seminar1_comment, seminar2_rating, seminar2_comment, quiz_answer, request"
+                " FROM responses WHERE id = :id",
+                id=response_id,
+            )
+            conn.run("DELETE FROM responses WHERE id = :id", id=response_id)
+            return True
     except Exception:
         return False
-    finally:
-        conn.close()
 
 
 def load_archived():
     """Load archived responses. Returns list of dicts with Japanese keys + id/deleted_at."""
     try:
-        conn = _get_conn()
-    except Exception:
-        return None
-    if conn is None:
-        return None
-    try:
-        # Purge old entries first
-        conn.run("DELETE FROM archived_responses WHERE deleted_at < NOW() - INTERVAL '30 days'")
-        result = conn.run(
-            "SELECT id, deleted_at, submitted_at, name, phone, email, company, department,"
-            " position, seminar1_rating, seminar1_comment, seminar2_rating,"
-            " seminar2_comment, quiz_answer, request"
-            " FROM archived_responses ORDER BY deleted_at DESC"
-        )
-        rows = []
-        for r in result:
-            row = {"id": r[0], "deleted_at": r[1].strftime("%Y-%m-%d %H:%M") if r[1] else ""}
-            row.update({_DB_TO_JP[col]: val for col, val in zip(_DB_COLS, r[2:])})
-            rows.append(row)
-        return rows
+        with _conn() as conn:
+            if conn is None:
+                return None
+            # Purge old entries first
+            conn.run("DELETE FROM archived_responses WHERE deleted_at < NOW() - INTERVAL '30 days'")
+            result = conn.run(
+                "SELECT id, deleted_at, submitted_at, name, phone, email, company, department,"
+                " position, seminar1_rating, seminar1_comment, seminar2_rating,"
+                " seminar2_comment, quiz_answer, request"
+                " FROM archived_responses ORDER BY deleted_at DESC"
+            )
+            rows = []
+            for r in result:
+                # SELECT order after id/deleted_at matches FIELDNAMES
+                row = dict(zip(FIELDNAMES, r[2:]))
+                row["id"] = r[0]
+                row["deleted_at"] = r[1].strftime("%Y-%m-%d %H:%M") if r[1] else ""
+                rows.append(row)
+            return rows
     except Exception:
         return None
-    finally:
-        conn.close()
 
 
 def restore_response(archive_id):
     """Restore an archived response back to the responses table."""
     try:
-        conn = _get_conn()
-    except Exception:
-        return False
-    if conn is None:
-        return False
-    try:
-        conn.run(
-            "INSERT INTO responses (submitted_at, name, phone, email, company, department,"
-            " position, seminar1_rating, seminar1_comment, seminar2_rating,"
-            " seminar2_comment, quiz_answer, request)"
-            " SELECT submitted_at, name, phone, email, company, department, position,"
-            " seminar1_rating, seminar1_comment, seminar2_rating, seminar2_comment, quiz_answer, request"
-            " FROM archived_responses WHERE id = :id",
-            id=archive_id,
-        )
-        conn.run("DELETE FROM archived_responses WHERE id = :id", id=archive_id)
-        return True
+        with _conn() as conn:
+            if conn is None:
+                return False
+            conn.run(
+                "INSERT INTO responses (submitted_at, name, phone, email, company, department,"
+                " position, seminar1_rating, seminar1_comment, seminar2_rating,"
+                " seminar2_comment, quiz_answer, request)"
+                " SELECT submitted_at, name, phone, email, company, department, position,"
+                " seminar1_rating, seminar1_comment, seminar2_rating, seminar2_comment, quiz_answer, request"
+                " FROM archived_responses WHERE id = :id",
+                id=archive_id,
+            )
+            conn.run("DELETE FROM archived_responses WHERE id = :id", id=archive_id)
+            return True
     except Exception:
         return False
-    finally:
-        conn.close()
 
 
-def responses_to_csv_string():
-    """Return all responses as a BOM-prefixed CSV string."""
-    rows = load_responses()
-    if rows is None:
-        return None
-    buf = io.StringIO()
-    buf.write("\ufeff")
-    writer = csv.DictWriter(buf, fieldnames=FIELDNAMES)
-    writer.writeheader()
-    for row in rows:
-        csv_row = {k: row[k] for k in FIELDNAMES}
-        writer.writerow(csv_row)
-    return buf.getvalue()
+def iter_responses(batch_size=1000):
+    """Yield response rows in FIELDNAMES order through a server-side cursor.
+
+    Only one batch is held in memory at a time; stops quietly on failure.
+    """
+    try:
+        with _conn() as conn:
+            if conn is None:
+                return
+            conn.run("BEGIN")
+            conn.run(
+                "DECLARE resp_export NO SCROLL CURSOR FOR"
+                " SELECT submitted_at, name, phone, email, company, department, position,"
+                " seminar1_rating, seminar1_comment, seminar2_rating, seminar2_comment, quiz_answer, request"
+                " FROM responses ORDER BY id"
+            )
+            while True:
+                batch = conn.run(f"FETCH {int(batch_size)} FROM resp_export")
+                if not batch:
+                    break
+                yield from batch
+            conn.run("CLOSE resp_export")
+            conn.run("COMMIT")
+    except Exception:
+        return
@@ -0,0 +1,18 @@
+#!/bin/sh
+# Serve app.py with gunicorn (threaded workers) instead of the Flask dev server.
+# The CSV fallback keeps per-process state (append buffer, lock), so multiple
+# worker processes are only used when PostgreSQL is configured.
+set -e
+cd "$(dirname "$0")"
+
+if [ -n "${POSTGRES_URL}${DATABASE_URL}" ]; then
+    WORKERS="${WEB_CONCURRENCY:-$(( $(nproc) * 2 ))}"
+else
+    WORKERS=1
+fi
+
+# Byte-compile up front so the first request in each worker skips it
+python -m compileall -q -j 0 app.py db.py wsgi.py
+
+exec gunicorn -k gthread -w "$WORKERS" --threads "${GUNICORN_THREADS:-8}" \
+    --bind "0.0.0.0:${PORT:-5000}" wsgi:application
@@ -0,0 +1,3 @@
+"""WSGI entry point for running app.py under a production server (see start.sh)."""
+
+from app import app as application